@@ -1,18 +1,22 @@
+import functools
 import os
-from typing import List, Optional
+from typing import FrozenSet, Optional
 
 
+@functools.lru_cache(maxsize=1)
 def get_workdir(default: str = "..") -> str:
     return os.getenv("TERRAFORM_WORKDIR", default)
 
 
-def get_tools_allowlist() -> Optional[List[str]]:
+@functools.lru_cache(maxsize=1)
+def get_tools_allowlist() -> Optional[FrozenSet[str]]:
     raw = os.getenv("TOOLS_ALLOWLIST")
     if not raw:
         return None  # None means all tools allowed
-    return [t.strip() for t in raw.split(",") if t.strip()]
+    return frozenset(t.strip() for t in raw.split(",") if t.strip())
 
 
+@functools.lru_cache(maxsize=1)
 def get_tools_timeout_seconds() -> int:
     try:
         return int(os.getenv("TOOLS_TIMEOUT_SECONDS", "120"))
@@ -20,8 +24,22 @@ def get_tools_timeout_seconds() -> int:
         return 120
 
 
+@functools.lru_cache(maxsize=1)
+def get_tf_parallelism() -> int:
+    try:
+        return int(os.getenv("TF_PARALLELISM", "10"))
+    except ValueError:
+        return 10
+
+
 def is_tool_allowed(tool_name: str) -> bool:
-    allow = get_tools_allowlist()
-    if allow is None:
-        return True
-    return tool_name in allow
+    allow = get_tools_allowlist()  # cached frozenset, built once per process
+    return allow is None or tool_name in allow
+
+
+def _reset_config_cache() -> None:
+    # Values are read from the environment once; call after mutating os.environ
+    get_workdir.cache_clear()
+    get_tools_allowlist.cache_clear()
+    get_tools_timeout_seconds.cache_clear()
+    get_tf_parallelism.cache_clear()
@@ -1,20 +1,19 @@
 import argparse
 import os
-import re
+import string
 import sys
+from typing import List, Optional
 
-from dotenv import load_dotenv, find_dotenv
-
-try:
-    from .config import get_workdir
-    from .orchestrator import run_review_flow, run_create_flow
-except ImportError:
+if not __package__:
+    # Running as a script (python agent/main.py): make the `agent` package importable
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from agent.config import get_workdir  # type: ignore
-    from agent.orchestrator import run_review_flow, run_create_flow  # type: ignore
+
+from agent import __version__
 
 
 def _load_env():
+    from dotenv import load_dotenv, find_dotenv
+
     env_path = find_dotenv(usecwd=True)
     if env_path:
         load_dotenv(env_path)
@@ -23,52 +22,112 @@ def _load_env():
         load_dotenv(agent_env, override=False)
 
 
+# Byte table: lowercase ASCII letters and digits map to themselves, everything else to "-"
+_SLUG_KEEP = frozenset((string.ascii_lowercase + string.digits).encode("ascii"))
+_SLUG_TABLE = bytes(c if c in _SLUG_KEEP else ord("-") for c in range(256))
+
+
 def _slugify(text: str, max_len: int = 60) -> str:
     text = text.strip().lower()
-    # Keep alphanumerics, replace others with hyphens
-    text = re.sub(r"[^a-z0-9]+", "-", text)
-    text = re.sub(r"-+", "-", text).strip("-")
+    # Keep alphanumerics, replace others with hyphens (non-ASCII becomes "?" first)
+    text = text.encode("ascii", "replace").translate(_SLUG_TABLE).decode("ascii")
+    text = "-".join(filter(None, text.split("-")))
     if not text:
         text = "generated-tf"
     return text[:max_len]
 
 
 def _derive_out_dir(spec_text: str, base_dir: str) -> str:
+    """
+    Pick a unique output directory for the spec and create it.
+    makedirs is the existence check, so there is no stat-then-create race.
+    """
     # Use first ~8 words to build slug
     head = " ".join(spec_text.split()[:8]) if spec_text else "generated tf"
     slug = _slugify(head)
     candidate = os.path.join(base_dir, slug)
-    if not os.path.exists(candidate):
-        return candidate
     # Avoid collisions by adding numeric suffix
     i = 2
     while True:
-        alt = os.path.join(base_dir, f"{slug}-{i}")
-        if not os.path.exists(alt):
-            return alt
-        i += 1
+        try:
+            os.makedirs(candidate)
+            return candidate
+        except FileExistsError:
+            candidate = os.path.join(base_dir, f"{slug}-{i}")
+            i += 1
+
+
+_MODES = ("review", "create")
+
+
+def _sniff_mode(argv: List[str]) -> Optional[str]:
+    # Cheap pre-parse of --mode; None means absent or ambiguous
+    found = set()
+    for i, arg in enumerate(argv):
+        if arg == "--mode" and i + 1 < len(argv):
+            found.add(argv[i + 1])
+        elif arg.startswith("--mode="):
+            found.add(arg.split("=", 1)[1])
+    if len(found) == 1:
+        mode = found.pop()
+        if mode in _MODES:
+            return mode
+    return None
+
+
+def _build_parser(mode: Optional[str]) -> argparse.ArgumentParser:
+    # Flags of the other mode stay accepted (scripts often pass the full set) but are hidden from help
+    review_help = mode != "create"
+    create_help = mode != "review"
+    parser = argparse.ArgumentParser(description="Gemini Terraform Agent")
+    parser.add_argument("--mode", choices=list(_MODES), default="review")
+    parser.add_argument("--workdir", default=None, help="Path to Terraform project (defaults to repo root)")
+    parser.add_argument("--version", action="version", version=__version__, help="Print the agent version and exit")
+    parser.add_argument(
+        "--force-init",
+        action="store_true",
+        help="Run terraform init even if already initialized" if review_help else argparse.SUPPRESS,
+    )
+    parser.add_argument(
+        "--out-dir", default=None, help="Output directory for create mode" if create_help else argparse.SUPPRESS
+    )
+    parser.add_argument("--spec", default=None, help="Inline text spec for create mode" if create_help else argparse.SUPPRESS)
+    parser.add_argument(
+        "--spec-file", default=None, help="Path to text spec file for create mode" if create_help else argparse.SUPPRESS
+    )
+    return parser
 
 
 def main():
-    _load_env()
+    # Fast path: answer --version before building the parser or importing anything heavy
+    if "--version" in sys.argv[1:]:
+        print(__version__)
+        return
 
-    parser = argparse.ArgumentParser(description="Gemini Terraform Agent")
-    parser.add_argument("--mode", choices=["review", "create"], default="review")
-    parser.add_argument("--workdir", default=None, help="Path to Terraform project (defaults to repo root)")
-    parser.add_argument("--out-dir", default=None, help="Output directory for create mode")
-    parser.add_argument("--spec", default=None, help="Inline text spec for create mode")
-    parser.add_argument("--spec-file", default=None, help="Path to text spec file for create mode")
+    parser = _build_parser(_sniff_mode(sys.argv[1:]))
     args = parser.parse_args()
 
+    # Both modes talk to Gemini; only load .env once args are known to be valid
+    _load_env()
+
     if args.workdir:
+        from agent.config import _reset_config_cache
+
         os.environ["TERRAFORM_WORKDIR"] = args.workdir
+        _reset_config_cache()
 
+    # Orchestrator/tool imports are deferred so --help and arg errors stay cheap
     if args.mode == "review":
-        markdown = run_review_flow()
+        from agent.orchestrator import run_review_flow
+
+        markdown = run_review_flow(force_init=args.force_init)
         print("Report written to report.md in workdir.")
         return
 
     if args.mode == "create":
+        from agent.config import get_workdir
+        from agent.orchestrator import generate_scaffold, write_scaffold
+
         base_dir = get_workdir()
         spec_text = args.spec
         if not spec_text and args.spec_file:
@@ -77,8 +136,13 @@ def main():
         if not spec_text:
             print("Provide --spec or --spec-file for create mode.")
             return
+        files, msg = generate_scaffold(spec_text)
+        if files is None:
+            print(msg)
+            return
+        # Only claim an output directory once the model reply has parsed
         out_dir = args.out_dir or _derive_out_dir(spec_text, base_dir)
-        written, msg = run_create_flow(spec_text, out_dir)
+        written, msg = write_scaffold(files, out_dir)
         print(msg)
         for p in written:
             print(p)
@@ -1,18 +1,29 @@
+import asyncio
+import functools
 import os
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-import google.generativeai as genai
+try:
+    import orjson as _json  # optional: faster parsing of large scaffold payloads
+except ImportError:
+    import json as _json
 
+from .config import get_workdir
 from .tools import (
     write_report,
     read_repo_files,
-    run_infracost,
-    run_security_scan,
-    run_terraform,
+    arun_infracost,
+    arun_security_scan,
+    arun_terraform,
 )
 
 
-def _configure_model() -> genai.GenerativeModel:
+@functools.lru_cache(maxsize=1)
+def _configure_model() -> "genai.GenerativeModel":
+    # One configured client per process, reused by every flow
+    # Imported lazily: the SDK pulls in grpc/protobuf, which is slow to load
+    import google.generativeai as genai
+
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise RuntimeError("GEMINI_API_KEY is not set")
@@ -24,23 +35,76 @@ def _safe(val: Dict) -> str:
     return (val or {}).get("stdout") or (val or {}).get("error") or ""
 
 
-def run_review_flow() -> str:
+# Upper bound for a single text part; larger payloads are split into a few chunks
+_MAX_PART_CHARS = 200_000
+
+
+def _join_parts(parts: List[str], limit: int = _MAX_PART_CHARS) -> List[str]:
+    """
+    Join prompt sections into as few text parts as possible (each at most ~limit chars),
+    so the SDK serializes a handful of messages instead of one per file/tool output.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for part in parts:
+        if current and size + len(part) > limit:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(part)
+        size += len(part) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _is_initialized(workdir: str) -> bool:
+    return os.path.isfile(os.path.join(workdir, ".terraform.lock.hcl")) and os.path.isdir(
+        os.path.join(workdir, ".terraform")
+    )
+
+
+def run_review_flow(force_init: bool = False) -> str:
     """
     Orchestrator-driven flow: executes tools (read files, terraform validate/plan/show,
     security, cost) and then asks Gemini to produce a single concise Markdown report.
+    `terraform init` is skipped when the workdir is already initialized unless force_init is set.
     """
-    model = _configure_model()
+    return asyncio.run(arun_review_flow(force_init=force_init))
 
-    files_res = read_repo_files(["*.tf"])  # keep it small; user can expand later
 
-    tf_init = run_terraform("init")
-    tf_validate = run_terraform("validate")
-    tf_plan = run_terraform("plan -out tf.plan")
-    tf_show_json = run_terraform("show -json tf.plan")
-    tf_show_text = run_terraform("show tf.plan") if not tf_show_json.get("ok") else {"ok": True, "stdout": ""}
+async def arun_review_flow(force_init: bool = False) -> str:
+    """
+    Async implementation of run_review_flow: init/validate/plan run in order, then
+    plan show, security scan and infracost are awaited concurrently as native subprocesses.
+    Blocking work (SDK setup, file I/O, the Gemini call) runs in worker threads so the loop stays free.
+    """
+    model = await asyncio.to_thread(_configure_model)
 
-    sec = run_security_scan()
-    cost = run_infracost()
+    # keep it small; user can expand later
+    files_res = await asyncio.to_thread(read_repo_files, ["*.tf"])
+
+    cached_init = not force_init and _is_initialized(os.path.abspath(get_workdir()))
+    if cached_init:
+        tf_init = {"ok": True, "stdout": "cached init"}
+    else:
+        tf_init = await arun_terraform("init")
+    tf_validate = await arun_terraform("validate")
+    tf_plan = await arun_terraform("plan -out tf.plan")
+    if cached_init and not (tf_validate.get("ok") and tf_plan.get("ok")):
+        # Providers/modules may have changed since the last init; init for real and retry once
+        tf_init = await arun_terraform("init")
+        if tf_init.get("ok"):
+            tf_validate = await arun_terraform("validate")
+            tf_plan = await arun_terraform("plan -out tf.plan")
+
+    # Remaining tools are independent subprocesses; overlap their wall time
+    tf_show_json, sec, cost = await asyncio.gather(
+        arun_terraform("show -json tf.plan"),
+        arun_security_scan(),
+        arun_infracost(),
+    )
+    tf_show_text = await arun_terraform("show tf.plan") if not tf_show_json.get("ok") else {"ok": True, "stdout": ""}
 
     instructions = (
         "You are a Terraform PR reviewer. Using the provided files and tool outputs, "
@@ -54,63 +118,80 @@ def run_review_flow() -> str:
         "Do not include any apply steps."
     )
 
-    parts: List[Dict[str, str]] = []
+    parts: List[str] = []
     if files_res.get("ok"):
         files = files_res.get("files", {})
         for rel, content in files.items():
-            parts.append({"text": f"File: {rel}\n```hcl\n{content}\n```"})
+            parts.append(f"File: {rel}\n```hcl\n{content}\n```")
     else:
-        parts.append({"text": f"Could not read files: {files_res.get('error','')}"})
+        parts.append(f"Could not read files: {files_res.get('error','')}")
 
-    parts.append({"text": f"Terraform init:\n```\n{_safe(tf_init)}\n```"})
-    parts.append({"text": f"Terraform validate:\n```\n{_safe(tf_validate)}\n```"})
+    parts.append(f"Terraform init:\n```\n{_safe(tf_init)}\n```")
+    parts.append(f"Terraform validate:\n```\n{_safe(tf_validate)}\n```")
 
     if tf_show_json.get("ok"):
-        parts.append({"text": f"Terraform plan (JSON):\n```json\n{tf_show_json.get('stdout','')}\n```"})
+        parts.append(f"Terraform plan (JSON):\n```json\n{tf_show_json.get('stdout','')}\n```")
     else:
-        parts.append({"text": f"Terraform plan (text):\n```\n{_safe(tf_show_text)}\n```"})
+        parts.append(f"Terraform plan (text):\n```\n{_safe(tf_show_text)}\n```")
 
     if sec.get("ok"):
-        parts.append({"text": f"Security scan ({sec.get('tool','unknown')}):\n```json\n{sec.get('stdout','')}\n```"})
+        parts.append(f"Security scan ({sec.get('tool','unknown')}):\n```json\n{sec.get('stdout','')}\n```")
     else:
-        parts.append({"text": f"Security scan unavailable: {sec.get('error','')}"})
+        parts.append(f"Security scan unavailable: {sec.get('error','')}")
 
     if cost.get("ok"):
-        parts.append({"text": f"Infracost:\n```json\n{cost.get('stdout','')}\n```"})
+        parts.append(f"Infracost:\n```json\n{cost.get('stdout','')}\n```")
     else:
-        parts.append({"text": f"Infracost unavailable: {cost.get('error','')}"})
+        parts.append(f"Infracost unavailable: {cost.get('error','')}")
 
-    content = [{"text": instructions}] + parts
-    response = model.generate_content(content)
+    content = [{"text": instructions}] + [{"text": chunk} for chunk in _join_parts(parts)]
+    response = await asyncio.to_thread(model.generate_content, content)
     final_text = response.text or ""
 
-    write_report(final_text)
+    await asyncio.to_thread(write_report, final_text)
     return final_text
 
 
+_QUOTE, _BACKSLASH = ord('"'), ord("\\")
+_OPENERS, _CLOSERS = (ord("{"), ord("[")), (ord("}"), ord("]"))
+
+
 def _extract_first_json_block(text: str) -> str:
     if not text:
         return ""
-    start = None
-    depth = 0
-    for i, ch in enumerate(text):
-        if ch in "[{":
-            start = i
-            depth = 1
-            break
-    if start is None:
+    # Scan UTF-8 bytes once (ints, no per-char str objects); brackets inside strings are ignored
+    data = text.encode("utf-8", "surrogatepass")
+    found = [i for i in (data.find(b"{"), data.find(b"[")) if i != -1]
+    if not found:
         return ""
-    for j in range(start + 1, len(text)):
-        if text[j] in "[{":
+    start = min(found)
+    depth = 0
+    in_string = False
+    escaped = False
+    for j, ch in enumerate(memoryview(data)[start:], start):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == _BACKSLASH:
+                escaped = True
+            elif ch == _QUOTE:
+                in_string = False
+        elif ch == _QUOTE:
+            in_string = True
+        elif ch in _OPENERS:
             depth += 1
-        elif text[j] in "]}":
+        elif ch in _CLOSERS:
             depth -= 1
             if depth == 0:
-                return text[start : j + 1]
+                return data[start : j + 1].decode("utf-8", "surrogatepass")
     return ""
 
 
-def run_create_flow(spec_text: str, out_dir: str) -> Tuple[List[str], str]:
+def generate_scaffold(spec_text: str) -> Tuple[Optional[List[Dict]], str]:
+    """
+    Ask Gemini for a scaffold and parse it. Returns (files, "") on success or (None, reason).
+    Nothing is written, so callers can defer claiming an output directory until this succeeds.
+    """
     model = _configure_model()
 
     system = (
@@ -127,22 +208,22 @@ def run_create_flow(spec_text: str, out_dir: str) -> Tuple[List[str], str]:
     ])
     text = resp.text or ""
 
-    import json
-
     json_block = _extract_first_json_block(text)
     if not json_block:
-        return [], "Model did not return JSON."
+        return None, "Model did not return JSON."
     try:
-        data = json.loads(json_block)
+        data = _json.loads(json_block.encode("utf-8", "surrogatepass"))
     except Exception as e:
-        return [], f"Failed to parse JSON: {e}"
+        return None, f"Failed to parse JSON: {e}"
 
-    files = data.get("files", [])
-    written: List[str] = []
+    return data.get("files", []), ""
 
+
+def write_scaffold(files: List[Dict], out_dir: str) -> Tuple[List[str], str]:
     if not os.path.isdir(out_dir):
         os.makedirs(out_dir, exist_ok=True)
 
+    written: List[str] = []
     for f in files:
         path = f.get("path")
         content = f.get("content", "")
@@ -157,3 +238,10 @@ def run_create_flow(spec_text: str, out_dir: str) -> Tuple[List[str], str]:
         written.append(dest_path)
 
     return written, f"Wrote {len(written)} files to {out_dir}."
+
+
+def run_create_flow(spec_text: str, out_dir: str) -> Tuple[List[str], str]:
+    files, msg = generate_scaffold(spec_text)
+    if files is None:
+        return [], msg
+    return write_scaffold(files, out_dir)
@@ -1,10 +1,14 @@
+import asyncio
+import fnmatch
+import functools
+import itertools
 import os
 import shutil
 import subprocess
 from glob import glob
-from typing import Dict, List, Tuple
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
 
-from .config import get_workdir, get_tools_timeout_seconds, is_tool_allowed
+from .config import get_workdir, get_tf_parallelism, get_tools_timeout_seconds, is_tool_allowed
 
 
 class ToolError(Exception):
@@ -12,27 +16,117 @@ class ToolError(Exception):
 
 
 def _run(cmd: List[str], cwd: str, timeout: int) -> Tuple[int, str, str]:
-    process = subprocess.Popen(
-        cmd,
+    # Capture raw bytes and decode once; large plan/infracost JSON avoids incremental decoding
+    try:
+        res = subprocess.run(cmd, cwd=cwd, capture_output=True, timeout=timeout, check=False)
+    except subprocess.TimeoutExpired:
+        raise ToolError(f"Command timed out: {' '.join(cmd)}")
+    return res.returncode, res.stdout.decode("utf-8", "replace"), res.stderr.decode("utf-8", "replace")
+
+
+async def _arun(cmd: List[str], cwd: str, timeout: int) -> Tuple[int, str, str]:
+    # Async counterpart of _run for the review pipeline
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
         cwd=cwd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        shell=False,
-        text=True,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
     )
     try:
-        stdout, stderr = process.communicate(timeout=timeout)
-    except subprocess.TimeoutExpired:
-        process.kill()
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
         raise ToolError(f"Command timed out: {' '.join(cmd)}")
-    return process.returncode, stdout, stderr
+    except asyncio.CancelledError:
+        # Don't leave terraform/scanners running when the caller gives up
+        if proc.returncode is None:
+            proc.kill()
+        raise
+    return proc.returncode, stdout.decode("utf-8", "replace"), stderr.decode("utf-8", "replace")
+
+
+@functools.lru_cache(maxsize=None)
+def _which(name: str) -> Optional[str]:
+    # PATH is scanned once per binary per process; use _which.cache_clear() to rescan
+    return shutil.which(name)
 
 
 def _ensure_binary(name: str) -> None:
-    if shutil.which(name) is None:
+    if _which(name) is None:
         raise ToolError(f"Binary not found on PATH: {name}")
 
 
+def _tool_context() -> Tuple[str, int]:
+    return os.path.abspath(get_workdir()), get_tools_timeout_seconds()
+
+
+def _terraform_cmd(cmd: str) -> List[str]:
+    _ensure_binary("terraform")
+    parts = cmd.strip().split()
+    if not parts:
+        raise ToolError("Empty terraform command")
+    sub = parts[0]
+    safe_subs = {"init", "validate", "plan", "show", "version"}
+    if sub not in safe_subs:
+        raise ToolError(f"Disallowed terraform subcommand: {sub}")
+    # Enforce non-interactive for safety
+    if sub == "init":
+        return ["terraform", "init", "-input=false"] + parts[1:]
+    if sub == "plan":
+        cmd_list = ["terraform", "plan", "-input=false", "-no-color"]
+        # Reviews only need the HCL diff; skip provider state refresh unless asked for
+        if not any(p.startswith("-refresh") for p in parts[1:]):
+            cmd_list.append("-refresh=false")
+        if not any(p.startswith("-parallelism") for p in parts[1:]):
+            cmd_list.append(f"-parallelism={get_tf_parallelism()}")
+        return cmd_list + parts[1:]
+    if sub == "show":
+        return ["terraform", "show", "-no-color"] + parts[1:]
+    if sub == "validate":
+        return ["terraform", "validate", "-no-color"] + parts[1:]
+    return ["terraform"] + parts
+
+
+def _security_cmd() -> Tuple[str, List[str]]:
+    # Try tfsec first, fall back to checkov
+    if _which("tfsec") is not None:
+        return "tfsec", ["tfsec", "--format", "json", "--no-color", "."]
+    if _which("checkov") is not None:
+        return "checkov", [
+            "checkov",
+            "-d",
+            ".",
+            "--output",
+            "json",
+        ]
+    raise ToolError("Neither tfsec nor checkov found on PATH")
+
+
+def _infracost_cmd() -> List[str]:
+    if _which("infracost") is None:
+        raise ToolError("Infracost not found on PATH")
+    return [
+        "infracost",
+        "breakdown",
+        "--path",
+        ".",
+        "--format",
+        "json",
+        "--no-color",
+    ]
+
+
+# Result builders shared by the sync tools and their async counterparts
+def _exit_result(code: int, out: str, err: str) -> Dict:
+    return {"ok": code == 0, "exit_code": code, "stdout": out, "stderr": err}
+
+
+def _security_result(tool: str, code: int, out: str, err: str) -> Dict:
+    ok = code in (0, 1)  # both scanners return 1 when issues are found
+    return {"ok": ok, "tool": tool, "exit_code": code, "stdout": out, "stderr": err}
+
+
 def run_terraform(cmd: str) -> Dict:
     """
     Execute a safe subset of terraform commands: init, validate, plan, show
@@ -42,32 +136,22 @@ def run_terraform(cmd: str) -> Dict:
     if not is_tool_allowed(tool_name):
         return {"ok": False, "error": f"Tool not allowed: {tool_name}"}
 
-    timeout = get_tools_timeout_seconds()
-    cwd = os.path.abspath(get_workdir())
+    try:
+        return _exit_result(*_run(_terraform_cmd(cmd), *_tool_context()))
+    except ToolError as te:
+        return {"ok": False, "error": str(te)}
+
+
+async def arun_terraform(cmd: str) -> Dict:
+    """
+    Awaitable form of run_terraform.
+    """
+    tool_name = "run_terraform"
+    if not is_tool_allowed(tool_name):
+        return {"ok": False, "error": f"Tool not allowed: {tool_name}"}
 
     try:
-        _ensure_binary("terraform")
-        parts = cmd.strip().split()
-        if not parts:
-            raise ToolError("Empty terraform command")
-        sub = parts[0]
-        safe_subs = {"init", "validate", "plan", "show", "version"}
-        if sub not in safe_subs:
-            raise ToolError(f"Disallowed terraform subcommand: {sub}")
-        # Enforce non-interactive for safety
-        if sub == "init":
-            cmd_list = ["terraform", "init", "-input=false"] + parts[1:]
-        elif sub == "plan":
-            cmd_list = ["terraform", "plan", "-input=false", "-no-color"] + parts[1:]
-        elif sub == "show":
-            cmd_list = ["terraform", "show", "-no-color"] + parts[1:]
-        elif sub == "validate":
-            cmd_list = ["terraform", "validate", "-no-color"] + parts[1:]
-        else:
-            cmd_list = ["terraform"] + parts
-
-        code, out, err = _run(cmd_list, cwd=cwd, timeout=timeout)
-        return {"ok": code == 0, "exit_code": code, "stdout": out, "stderr": err}
+        return _exit_result(*await _arun(_terraform_cmd(cmd), *_tool_context()))
     except ToolError as te:
         return {"ok": False, "error": str(te)}
 
@@ -80,30 +164,26 @@ def run_security_scan() -> Dict:
     if not is_tool_allowed(tool_name):
         return {"ok": False, "error": f"Tool not allowed: {tool_name}"}
 
-    timeout = get_tools_timeout_seconds()
-    cwd = os.path.abspath(get_workdir())
+    try:
+        tool, cmd_list = _security_cmd()
+        return _security_result(tool, *_run(cmd_list, *_tool_context()))
+    except ToolError as te:
+        return {"ok": False, "error": str(te)}
 
-    # Try tfsec first
-    if shutil.which("tfsec") is not None:
-        cmd_list = ["tfsec", "--format", "json", "--no-color", "."]
-        code, out, err = _run(cmd_list, cwd=cwd, timeout=timeout)
-        ok = code == 0 or code == 1  # tfsec returns 1 when issues found
-        return {"ok": ok, "tool": "tfsec", "exit_code": code, "stdout": out, "stderr": err}
 
-    # Fallback to checkov
-    if shutil.which("checkov") is not None:
-        cmd_list = [
-            "checkov",
-            "-d",
-            ".",
-            "--output",
-            "json",
-        ]
-        code, out, err = _run(cmd_list, cwd=cwd, timeout=timeout)
-        ok = code in (0, 1)  # issues may return non-zero
-        return {"ok": ok, "tool": "checkov", "exit_code": code, "stdout": out, "stderr": err}
+async def arun_security_scan() -> Dict:
+    """
+    Awaitable form of run_security_scan.
+    """
+    tool_name = "run_security_scan"
+    if not is_tool_allowed(tool_name):
+        return {"ok": False, "error": f"Tool not allowed: {tool_name}"}
 
-    return {"ok": False, "error": "Neither tfsec nor checkov found on PATH"}
+    try:
+        tool, cmd_list = _security_cmd()
+        return _security_result(tool, *await _arun(cmd_list, *_tool_context()))
+    except ToolError as te:
+        return {"ok": False, "error": str(te)}
 
 
 def run_infracost() -> Dict:
@@ -114,24 +194,116 @@ def run_infracost() -> Dict:
     if not is_tool_allowed(tool_name):
         return {"ok": False, "error": f"Tool not allowed: {tool_name}"}
 
-    timeout = get_tools_timeout_seconds()
-    cwd = os.path.abspath(get_workdir())
+    try:
+        return _exit_result(*_run(_infracost_cmd(), *_tool_context()))
+    except ToolError as te:
+        return {"ok": False, "error": str(te)}
 
-    if shutil.which("infracost") is None:
-        return {"ok": False, "error": "Infracost not found on PATH"}
 
-    cmd_list = [
-        "infracost",
-        "breakdown",
-        "--path",
-        ".",
-        "--format",
-        "json",
-        "--no-color",
-    ]
-    code, out, err = _run(cmd_list, cwd=cwd, timeout=timeout)
-    ok = code == 0
-    return {"ok": ok, "exit_code": code, "stdout": out, "stderr": err}
+async def arun_infracost() -> Dict:
+    """
+    Awaitable form of run_infracost.
+    """
+    tool_name = "run_infracost"
+    if not is_tool_allowed(tool_name):
+        return {"ok": False, "error": f"Tool not allowed: {tool_name}"}
+
+    try:
+        return _exit_result(*await _arun(_infracost_cmd(), *_tool_context()))
+    except ToolError as te:
+        return {"ok": False, "error": str(te)}
+
+
+def _is_hidden(name: str) -> bool:
+    return name.startswith(".")
+
+
+def _match_parts(rel_parts: List[str], pat_parts: List[str]) -> bool:
+    # Mirrors glob: wildcards never match a leading dot, only a segment that itself starts with "." does
+    if not pat_parts:
+        return not rel_parts
+    head = pat_parts[0]
+    if head == "**":
+        # "**" spans zero or more non-hidden directory levels, as with glob(recursive=True)
+        for i in range(len(rel_parts) + 1):
+            if i and _is_hidden(rel_parts[i - 1]):
+                break
+            if _match_parts(rel_parts[i:], pat_parts[1:]):
+                return True
+        return False
+    if not rel_parts:
+        return False
+    if _is_hidden(rel_parts[0]) and not _is_hidden(head):
+        return False
+    return fnmatch.fnmatchcase(rel_parts[0], head) and _match_parts(rel_parts[1:], pat_parts[1:])
+
+
+def _iter_files(cwd: str, patterns: List[str]) -> Iterator[Tuple[str, str, int]]:
+    """
+    Single scandir pass over cwd yielding (path, rel, size) for files matching any pattern.
+    Patterns must be normalized and relative to cwd; hidden entries (e.g. .terraform) are
+    only visited when some pattern names a dot-prefixed segment.
+    """
+    pat_parts = [p.replace(os.sep, "/").split("/") for p in patterns]
+    max_depth = None if any("**" in pp for pp in pat_parts) else max((len(pp) for pp in pat_parts), default=0)
+    walk_hidden = any(_is_hidden(seg) for pp in pat_parts for seg in pp)
+    try:
+        root = os.stat(cwd)
+    except OSError:
+        return
+    # Each stack item carries the (dev, inode) of its ancestors so symlink cycles are not followed
+    stack: List[Tuple[str, List[str], FrozenSet[Tuple[int, int]]]] = [(cwd, [], frozenset([(root.st_dev, root.st_ino)]))]
+    while stack:
+        dir_path, dir_parts, ancestors = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            continue  # unreadable directory: skip it, as glob does
+        for entry in entries:
+            if not walk_hidden and _is_hidden(entry.name):
+                continue
+            parts = dir_parts + [entry.name]
+            try:
+                # Follows symlinks, like glob; stat results are cached on the DirEntry
+                if entry.is_dir():
+                    if max_depth is None or len(parts) < max_depth:
+                        # os.stat, not entry.stat: DirEntry leaves st_dev/st_ino as 0 on Windows
+                        st = os.stat(entry.path)
+                        key = (st.st_dev, st.st_ino)
+                        if key not in ancestors:
+                            stack.append((entry.path, parts, ancestors | {key}))
+                    continue
+                if not entry.is_file():
+                    continue
+                if any(_match_parts(parts, pp) for pp in pat_parts):
+                    yield entry.path, os.path.join(*parts), entry.stat().st_size
+            except OSError:
+                continue
+
+
+def _iter_glob(cwd: str, patterns: List[str]) -> Iterator[Tuple[str, str, int]]:
+    # Fallback for patterns that reach outside cwd (absolute or containing "..")
+    for pattern in patterns:
+        for path in glob(os.path.join(cwd, pattern), recursive=True):
+            try:
+                if os.path.isdir(path):
+                    continue
+                yield path, os.path.relpath(path, cwd), os.path.getsize(path)
+            except OSError:
+                continue
+
+
+def _split_patterns(patterns: List[str]) -> Tuple[List[str], List[str]]:
+    walk: List[str] = []
+    fallback: List[str] = []
+    for pattern in patterns:
+        norm = os.path.normpath(pattern)
+        if os.path.isabs(norm) or norm == os.pardir or norm.startswith(os.pardir + os.sep):
+            fallback.append(pattern)
+        elif norm != os.curdir:
+            walk.append(norm)
+    return walk, fallback
 
 
 def read_repo_files(globs_patterns: List[str]) -> Dict:
@@ -142,18 +314,16 @@ def read_repo_files(globs_patterns: List[str]) -> Dict:
     cwd = os.path.abspath(get_workdir())
     files: Dict[str, str] = {}
     try:
-        for pattern in globs_patterns:
-            for path in glob(os.path.join(cwd, pattern), recursive=True):
-                if os.path.isdir(path):
-                    continue
-                try:
-                    if os.path.getsize(path) > 1_000_000:
-                        continue
-                    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                        rel = os.path.relpath(path, cwd)
-                        files[rel] = f.read()
-                except Exception:
-                    continue
+        walk, fallback = _split_patterns(globs_patterns)
+        for path, rel, size in itertools.chain(_iter_files(cwd, walk), _iter_glob(cwd, fallback)):
+            if size > 1_000_000:
+                continue
+            try:
+                # One-shot binary read + single decode skips the TextIOWrapper layer
+                with open(path, "rb") as f:
+                    files[rel] = f.read().decode("utf-8", "ignore")
+            except Exception:
+                continue
         return {"ok": True, "files": files}
     except Exception as e:
         return {"ok": False, "error": str(e)}